@@ -1,22 +1,36 @@
-import json
 import sys
 
+try:
+    from orjson import loads
+except ImportError:  # stdlib json also parses bytes
+    from json import loads
+
 def read_jsonl(path):
-    with open(path, "r", encoding="utf-8") as f:
+    with open(path, "rb") as f:
         for line in f:
             if line.strip():
-                yield json.loads(line)
+                yield loads(line)
+
+FLUSH_BYTES = 1 << 16
+ARROW = "\n  → ".encode("utf-8")
 
 def main(infile):
+    # Accumulate UTF-8 output and hand it to the raw stdout buffer in ~64 KiB
+    # writes instead of one text-layer write per record
+    out = sys.stdout.buffer
+    buf = bytearray()
     for record in read_jsonl(infile):
         text = record["text"]
         substrings = [text[s["start"]:s["end"]] for s in record.get("spans", [])]
-        print(text)
-        if substrings:
-            print("  →", ", ".join(substrings))
-        else:
-            print("  → (no spans)")
-        print("________")
+        buf += text.encode("utf-8")
+        buf += ARROW
+        buf += (", ".join(substrings) if substrings else "(no spans)").encode("utf-8")
+        buf += b"\n________\n"
+        if len(buf) >= FLUSH_BYTES:
+            out.write(buf)
+            buf.clear()
+    out.write(buf)
+    out.flush()
 
 if __name__ == "__main__":
     main("./privately-dataset/annotated.jsonl")
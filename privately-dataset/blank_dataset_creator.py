@@ -1,4 +1,4 @@
-import json, uuid, pathlib
+from dataset_io import dumps_line, uuid4_batch
 
 # Path to your text file with one sentence per line
 INPUT_FILE = "./privately-dataset/sentences.txt"
@@ -8,14 +8,9 @@ OUTPUT_FILE = "./privately-dataset/to_annotate.jsonl"
 with open(INPUT_FILE, "r", encoding="utf-8") as f:
     sentences = [line.strip() for line in f if line.strip()]
 
-# Convert to JSONL with empty spans
-pathlib.Path(OUTPUT_FILE).write_text(
-    "\n".join(
-        json.dumps({"id": str(uuid.uuid4()), "text": s, "spans": []}, ensure_ascii=False)
-        for s in sentences
-    ),
-    encoding="utf-8"
-)
+# Convert to JSONL with empty spans, streamed straight to disk
+with open(OUTPUT_FILE, "wb", buffering=1 << 20) as out:
+    for ex_id, s in zip(uuid4_batch(len(sentences)), sentences):
+        out.write(dumps_line({"id": ex_id, "text": s, "spans": []}))
 
 print(f"Wrote {len(sentences)} examples to {OUTPUT_FILE}")
-
@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
-import csv, json, uuid, pathlib, random, re
-from typing import List, Dict, Tuple, Optional
+import csv, os, pathlib, random, re
+import multiprocessing as mp
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Iterable, List, Dict, Tuple, Optional
+
+from dataset_io import dumps_line, uuid4_batch
 
 # ====== Config ======
 PII_CSV      = "./privately-dataset/pii_database.csv"
 OUTPUT_FILE  = "./privately-dataset/clean2.jsonl"
 NUM_SAMPLES  = 4744
 RANDOM_SEED  = 42  # set to None for full randomness
+NUM_WORKERS  = None  # None -> os.cpu_count(); 1 runs in-process
+CHUNK_SIZE   = 512   # samples per seeded chunk; output depends on this, not on NUM_WORKERS
 
 # Probabilities
 P_SPLIT_NAME    = 0.20   # chance to insert a separator inside name
@@ -19,6 +26,22 @@ P_CASE_UPPER    = 0.15
 P_CASE_TITLE    = 0.15
 P_DOUBLE_SP     = 0.05
 
+# Dedicated generator (seeded per chunk in gen_chunk) instead of the shared module-level state
+_rng = random.Random()
+
+# ====== Patterns (compiled once) ======
+_WS_RE         = re.compile(r"\s+")
+_GAP_RE        = re.compile(r"(?<=\w) (?=\w)")
+_SPLIT_WS_RE   = re.compile(r"(\s+)")
+_NAME_SPLIT_RE = re.compile(r"[\s\-_/]+")
+# unit | postal | BLK, fused so addresses are scanned once
+_ADDR_NOISE_RE = re.compile(
+    r"#\s*\d{1,3}[-–]\d{1,4}"
+    r"|\bS(?:ingapore)?\s*[\( ]?\d{5,6}\)?"
+    r"|\bBLK\s*\d+\b",
+    re.IGNORECASE,
+)
+
 # ====== Helpers ======
 def pick_headers(headers: List[str]) -> Tuple[str, str]:
     """Return (name_col, address_col) from headers (case-insensitive)."""
@@ -40,18 +63,25 @@ def pick_headers(headers: List[str]) -> Tuple[str, str]:
     return name_col, addr_col
 
 def normalize_ws(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip()\
+    return _WS_RE.sub(" ", s).strip()
 
 # ---- Light fuzz (single '-' or '_' outside entities) ----
 LIGHT_FUZZ_PROB = 0.15            # lower probability
 LIGHT_FUZZ_TOKENS = ["-", "_"]    # only common separators
 
-def _overlaps(i: int, spans: List[Tuple[int,int]]) -> bool:
-    # i is an index in the original text for the space char position
-    for s, e in spans:
-        if s <= i < e:
-            return True
-    return False
+def _outside_spans(positions: Iterable[int], spans: List[Tuple[int,int]]) -> List[int]:
+    """Keep the positions not covered by any [s, e) span (spans may overlap)."""
+    if not spans:
+        return list(positions)
+    spans = sorted(spans)
+    starts = [s for s, _ in spans]
+    reach = list(accumulate((e for _, e in spans), max))  # furthest end of spans[:k+1]
+    out = []
+    for i in positions:
+        k = bisect_right(starts, i) - 1
+        if k < 0 or reach[k] <= i:
+            out.append(i)
+    return out
 
 def apply_light_fuzz_outside_entities(text: str, protected_spans: List[Tuple[int,int]],
                                       p: float = LIGHT_FUZZ_PROB):
@@ -60,22 +90,17 @@ def apply_light_fuzz_outside_entities(text: str, protected_spans: List[Tuple[int
     Never modify inside any protected span (entities).
     Returns (text2, fuzz_info | None).
     """
-    import re, random
-    if random.random() >= p:
+    if _rng.random() >= p:
         return text, None
 
     # candidates: positions of spaces between \w and \w (simple & safe)
-    candidates = []
-    for m in re.finditer(r'(?<=\w) (?=\w)', text):
-        i = m.start() + 1  # index of the space character
-        if not _overlaps(i, protected_spans):
-            candidates.append(i)
+    candidates = _outside_spans((m.start() + 1 for m in _GAP_RE.finditer(text)), protected_spans)
 
     if not candidates:
         return text, None
 
-    pos = random.choice(candidates)
-    token = random.choice(LIGHT_FUZZ_TOKENS)
+    pos = _rng.choice(candidates)
+    token = _rng.choice(LIGHT_FUZZ_TOKENS)
     text2 = text[:pos] + token + text[pos+1:]  # replace that ONE space
 
     return text2, {"pos": pos, "inserted": token}
@@ -83,16 +108,16 @@ def apply_light_fuzz_outside_entities(text: str, protected_spans: List[Tuple[int
 
 def maybe_split_tokens(text: str) -> str:
     """Replace one whitespace with a random separator to simulate splits (one split)."""
-    parts = re.split(r"(\s+)", text)
+    parts = _SPLIT_WS_RE.split(text)
     gaps = [i for i in range(1, len(parts)-1, 2)]
     if not gaps:
         return text
-    i = random.choice(gaps)
-    parts[i] = random.choice([" ", "  ", "   ", "\n", "\t", " - ", " _ ", ".", " · "])
+    i = _rng.choice(gaps)
+    parts[i] = _rng.choice([" ", "  ", "   ", "\n", "\t", " - ", " _ ", ".", " · "])
     return "".join(parts)
 
 def maybe_jitter_case(s: str) -> str:
-    r = random.random()
+    r = _rng.random()
     if r < P_CASE_UPPER:
         return s.upper()
     if r < P_CASE_UPPER + P_CASE_TITLE:
@@ -100,9 +125,20 @@ def maybe_jitter_case(s: str) -> str:
     return s
 
 def maybe_double_spaces(s: str) -> str:
-    if random.random() < P_DOUBLE_SP:
-        # double a few whitespace occurrences
-        return re.sub(r"\s", lambda m: m.group(0)*2, s, count=random.randint(1, 3))
+    if _rng.random() < P_DOUBLE_SP:
+        # double the first 1-3 whitespace occurrences (plain slicing, no regex callback)
+        count = _rng.randint(1, 3)
+        parts = []
+        prev = 0
+        for i, c in enumerate(s):
+            if c.isspace():
+                parts.append(s[prev:i+1])
+                prev = i  # next slice starts at the same char -> doubled
+                count -= 1
+                if not count:
+                    break
+        parts.append(s[prev:])
+        return "".join(parts)
     return s
 
 # ---------- NEW: partials ----------
@@ -111,7 +147,7 @@ def partial_name(full: str) -> str:
     Choose a sub-span of the name:
     - first token, last token, first+last, first two, middle, etc.
     """
-    toks = [t for t in re.split(r"[\s\-_/]+", full) if t]
+    toks = [t for t in _NAME_SPLIT_RE.split(full) if t]
     if not toks:
         return full
     strategies = []
@@ -131,20 +167,23 @@ def partial_name(full: str) -> str:
             lambda ts: " ".join(ts[mid:mid+2]) if mid+1 < len(ts) else ts[mid],
             lambda ts: " ".join(ts[1:-1]),      # drop first/last
         ]
-    pick = random.choice(strategies) if strategies else (lambda ts: " ".join(ts))
+    pick = _rng.choice(strategies) if strategies else (lambda ts: " ".join(ts))
     return pick(toks)
 
 _STREET_KEYS = {
     "ST","ST.","STREET","AVE","AVENUE","RD","ROAD","DR","DRIVE","CRES","CRESCENT",
     "LOR","LORONG","JLN","JALAN","LINK","CLOSE","CL","PL","PLACE","LANE","LN","TER","TERRACE","CIR","CIRCLE"
 }
+# Upper/lower/title spellings, so tokens are matched without an upper() copy each
+_STREET_KEYS_CI = frozenset(
+    _STREET_KEYS
+    | {k.lower() for k in _STREET_KEYS}
+    | {k.title() for k in _STREET_KEYS}
+)
 
 def strip_addr_noise(s: str) -> str:
     """Drop common SG address add-ons: unit, postal, BLK."""
-    s = re.sub(r"#\s*\d{1,3}[-–]\d{1,4}", "", s)  # unit
-    s = re.sub(r"\bS(?:ingapore)?\s*[\( ]?\d{5,6}\)?", "", s, flags=re.IGNORECASE)  # postal
-    s = re.sub(r"\bBLK\s*\d+\b", "", s, flags=re.IGNORECASE)  # BLK
-    return normalize_ws(s)
+    return normalize_ws(_ADDR_NOISE_RE.sub("", s))
 
 def keep_street_core(s: str) -> str:
     """Try to keep just the street + number (e.g., ANG MO KIO AVE 3)."""
@@ -153,12 +192,14 @@ def keep_street_core(s: str) -> str:
         return s
     idx = None
     for i,t in enumerate(toks):
-        if t.upper() in _STREET_KEYS:
+        if t in _STREET_KEYS_CI:
             idx = i; break
     if idx is None and len(toks) >= 2:
         # heuristic: last 2–4 tokens often are the street core
-        n = random.choice([2,3,4])
+        n = _rng.choice([2,3,4])
         return " ".join(toks[-n:])
+    if idx is None:  # a single token with no street keyword
+        return s
     # include the keyword and a couple tokens around it
     end = min(len(toks), idx+3)
     start = max(0, idx-2)
@@ -186,7 +227,7 @@ def partial_addr(full: str) -> str:
     # fall back to original if all else fails
     options.append(s0)
     # return a random non-empty choice
-    cand = random.choice([o for o in options if o.strip()] or [s0])
+    cand = _rng.choice([o for o in options if o.strip()] or [s0])
     return cand
 
 def transform_entity_with_partials(s: str, p_partial: float, p_split: float, kind: str) -> str:
@@ -194,14 +235,14 @@ def transform_entity_with_partials(s: str, p_partial: float, p_split: float, kin
     if not s:
         return s
     out = s
-    if random.random() < p_partial:
+    if _rng.random() < p_partial:
         if kind == "name":
             out = partial_name(out)
         elif kind == "addr":
             out = partial_addr(out)
     out = maybe_jitter_case(out)
     out = maybe_double_spaces(out)
-    if random.random() < p_split:
+    if _rng.random() < p_split:
         out = maybe_split_tokens(out)
     return out
 
@@ -219,95 +260,110 @@ def find_all_spans(text: str, needle: str) -> List[Tuple[int, int]]:
         start = i + n
     return spans
 
-def build_variants(name_ins: str, addr_ins: str) -> List[str]:
-    bag: List[str] = []
+def find_entity_spans(text: str, name_ins: str, addr_ins: str) -> List[Tuple[int, int, str]]:
+    """All (start, end, label) occurrences of the inserted NAME / ADDR strings."""
+    spans = [(s, e, "NAME") for s, e in find_all_spans(text, name_ins)]
+    spans += [(s, e, "ADDR") for s, e in find_all_spans(text, addr_ins)]
+    return spans
 
+# Templates use "{name_ins}" / "{addr_ins}" placeholders; only the chosen one is formatted
+_BOTH_TMPLS: Tuple[str, ...] = (
+    # clean anchors
+    "Meet {name_ins} at {addr_ins} tomorrow.",
+    "Delivery for {name_ins} at {addr_ins} has been scheduled.",
+    "{name_ins} recently moved to {addr_ins}.",
+    'console.error("export", "{name_ins}", "{addr_ins}");',
+    # longer ones (kept from your set)
+    "Hello ops-team, please schedule a delivery for valued customer {name_ins}, currently registered under residential address {addr_ins}, ensure you confirm by phone and log into CRM with a timestamp for compliance purposes.",
+    "Audit trail requires storing the following: full legal name {name_ins}, official correspondence address {addr_ins}, last login, current IP, MFA state, and document verification status.",
+    "[2025-08-30 17:42:19Z] EVENT=USER_UPDATE :: user={name_ins} :: addr={addr_ins} :: status=pending_review :: flag=postal_mismatch",
+    '{{"event":"shipment","payload":{{"name":"{name_ins}","addr":"{addr_ins}","priority":"HIGH","tags":["sg","manual_check"]}}}}',
+    "SQL> INSERT INTO recipients(full_name, address, status, created_at) VALUES ('{name_ins}','{addr_ins}','active','2025-08-30T12:33:00'); -- logID=34992",
+    "<recipient><fullName>{name_ins}</fullName><addressLine>{addr_ins}</addressLine><region>Singapore</region><postal>???</postal><flag>review</flag></recipient>",
+    "/* SECURITY WARNING */ validateRecipient(name='{name_ins}', addr='{addr_ins}', mode='strict', retries=3, trace=True)",
+    "DEBUG -- preparing export job: recipient={name_ins} at destination={addr_ins}, packaging=fragile, insurance=YES, SLA=24h window",
+    "INFO 2025-08-30T08:22Z -- Completed onboarding for {name_ins}, default delivery location {addr_ins}, subscription=PREMIUM, invoice cycle=monthly",
+)
+
+_NAME_TMPLS: Tuple[str, ...] = (
+    "{name_ins} signed in.",
+    "Contact person is {name_ins}.",
+    "Recipient: {name_ins}",
+    'const name = "{name_ins}";',
+    "System log event captured: user {name_ins} authenticated successfully with multi-factor override, assigned elevated privileges to resource-group=admin-core, session expiry=2h, security flag=review.",
+    "Customer record update required → identity holder: {name_ins}, outstanding orders exist, ensure KYC forms are attached before next payment cycle.",
+    "TRACE: user={name_ins} attempted login with MFA disabled, geo=SG, device=Android, browser=Chrome/119.0, ip=203.0.113.45",
+    '{{"user":"{name_ins}","role":"owner","status":"active","groups":["sg-admin","beta-testers"],"lastSeen":"2025-08-30T07:15:00Z"}}',
+    "/* Assign new ACL */ grantAccess(user='{name_ins}', role='viewer', expiry='2025-12-31T23:59:59')",
+    "CRITICAL ALERT: Suspicious activity detected for account holder {name_ins}, triggered anomaly detection threshold=0.87, notify SOC immediately.",
+    "commit 9f2c45 -- feat(auth): add session hook for user {name_ins}, track token revocation across clusters",
+)
+
+_ADDR_TMPLS: Tuple[str, ...] = (
+    "Ship to {addr_ins}.",
+    "Meeting location: {addr_ins}.",
+    "New address on file: {addr_ins}",
+    'const address = "{addr_ins}";',
+    "Maintenance ticket created: physical site {addr_ins}, severity=2, reported by IoT-sensor cluster #443, ETA technician dispatch=3h, SLA target=12h window.",
+    "Logistics planning requires accurate mapping: primary hub={addr_ins}, route optimized for fuel efficiency, fallback depot=Jurong, geo-coordinates attached.",
+    "[WARN] address={addr_ins} failed geocode lookup; fallback triggered to external service; verify manually before committing to ERP system.",
+    '{{"deliveryPoint":"{addr_ins}","region":"SG","geocoded":false,"priority":"MEDIUM","sla":"48h"}}',
+    "SQL> UPDATE addresses SET verified=true, updated_at=NOW() WHERE addr='{addr_ins}' AND country='SG';",
+    "<location><address>{addr_ins}</address><zone>North-East</zone><postal>unknown</postal><status>pending</status></location>",
+    "curl -X POST https://api.ship/validate -d 'addr={addr_ins}&country=SG' -H 'Authorization: Bearer ...'",
+    "# TODO: verify {addr_ins} with Singapore Land Authority dataset; ensure lat/long precision < 30m",
+)
+
+def render_variant(name_ins: str, addr_ins: str, roll: float) -> str:
+    """Pick the template for `roll` in [0, 1) and format just that one ("" if nothing to insert)."""
     if name_ins and addr_ins:
-        bag += [
-            # clean anchors
-            f"Meet {name_ins} at {addr_ins} tomorrow.",
-            f"Delivery for {name_ins} at {addr_ins} has been scheduled.",
-            f"{name_ins} recently moved to {addr_ins}.",
-            f'console.error("export", "{name_ins}", "{addr_ins}");',
-            # longer ones (kept from your set)
-            f"Hello ops-team, please schedule a delivery for valued customer {name_ins}, currently registered under residential address {addr_ins}, ensure you confirm by phone and log into CRM with a timestamp for compliance purposes.",
-            f"Audit trail requires storing the following: full legal name {name_ins}, official correspondence address {addr_ins}, last login, current IP, MFA state, and document verification status.",
-            f"[2025-08-30 17:42:19Z] EVENT=USER_UPDATE :: user={name_ins} :: addr={addr_ins} :: status=pending_review :: flag=postal_mismatch",
-            f'{{"event":"shipment","payload":{{"name":"{name_ins}","addr":"{addr_ins}","priority":"HIGH","tags":["sg","manual_check"]}}}}',
-            f"SQL> INSERT INTO recipients(full_name, address, status, created_at) VALUES ('{name_ins}','{addr_ins}','active','2025-08-30T12:33:00'); -- logID=34992",
-            f"<recipient><fullName>{name_ins}</fullName><addressLine>{addr_ins}</addressLine><region>Singapore</region><postal>???</postal><flag>review</flag></recipient>",
-            f"/* SECURITY WARNING */ validateRecipient(name='{name_ins}', addr='{addr_ins}', mode='strict', retries=3, trace=True)",
-            f"DEBUG -- preparing export job: recipient={name_ins} at destination={addr_ins}, packaging=fragile, insurance=YES, SLA=24h window",
-            f"INFO 2025-08-30T08:22Z -- Completed onboarding for {name_ins}, default delivery location {addr_ins}, subscription=PREMIUM, invoice cycle=monthly",
-        ]
-
+        tmpls = _BOTH_TMPLS
     elif name_ins:
-        bag += [
-            f"{name_ins} signed in.",
-            f"Contact person is {name_ins}.",
-            f"Recipient: {name_ins}",
-            f'const name = "{name_ins}";',
-            f"System log event captured: user {name_ins} authenticated successfully with multi-factor override, assigned elevated privileges to resource-group=admin-core, session expiry=2h, security flag=review.",
-            f"Customer record update required → identity holder: {name_ins}, outstanding orders exist, ensure KYC forms are attached before next payment cycle.",
-            f"TRACE: user={name_ins} attempted login with MFA disabled, geo=SG, device=Android, browser=Chrome/119.0, ip=203.0.113.45",
-            f'{{"user":"{name_ins}","role":"owner","status":"active","groups":["sg-admin","beta-testers"],"lastSeen":"2025-08-30T07:15:00Z"}}',
-            f"/* Assign new ACL */ grantAccess(user='{name_ins}', role='viewer', expiry='2025-12-31T23:59:59')",
-            f"CRITICAL ALERT: Suspicious activity detected for account holder {name_ins}, triggered anomaly detection threshold=0.87, notify SOC immediately.",
-            f"commit 9f2c45 -- feat(auth): add session hook for user {name_ins}, track token revocation across clusters",
-        ]
-
+        tmpls = _NAME_TMPLS
     elif addr_ins:
-        bag += [
-            f"Ship to {addr_ins}.",
-            f"Meeting location: {addr_ins}.",
-            f"New address on file: {addr_ins}",
-            f'const address = "{addr_ins}";',
-            f"Maintenance ticket created: physical site {addr_ins}, severity=2, reported by IoT-sensor cluster #443, ETA technician dispatch=3h, SLA target=12h window.",
-            f"Logistics planning requires accurate mapping: primary hub={addr_ins}, route optimized for fuel efficiency, fallback depot=Jurong, geo-coordinates attached.",
-            f"[WARN] address={addr_ins} failed geocode lookup; fallback triggered to external service; verify manually before committing to ERP system.",
-            f'{{"deliveryPoint":"{addr_ins}","region":"SG","geocoded":false,"priority":"MEDIUM","sla":"48h"}}',
-            f"SQL> UPDATE addresses SET verified=true, updated_at=NOW() WHERE addr='{addr_ins}' AND country='SG';",
-            f"<location><address>{addr_ins}</address><zone>North-East</zone><postal>unknown</postal><status>pending</status></location>",
-            f"curl -X POST https://api.ship/validate -d 'addr={addr_ins}&country=SG' -H 'Authorization: Bearer ...'",
-            f"# TODO: verify {addr_ins} with Singapore Land Authority dataset; ensure lat/long precision < 30m",
-        ]
-
-    return bag
+        tmpls = _ADDR_TMPLS
+    else:
+        return ""
+    return tmpls[int(roll * len(tmpls))].format(name_ins=name_ins, addr_ins=addr_ins)
 
 
 # ====== Main ======
-def main():
-    if RANDOM_SEED is not None:
-        random.seed(RANDOM_SEED)
-
-    pathlib.Path(OUTPUT_FILE).parent.mkdir(parents=True, exist_ok=True)
-
-    # Read CSV
+def load_rows() -> List[Dict[str, str]]:
+    # Read CSV (plain csv.reader + column indices; no per-row dict of unused columns)
     with open(PII_CSV, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        headers = reader.fieldnames or []
+        reader = csv.reader(f)
+        headers = next(reader, [])
         name_col, addr_col = pick_headers(headers)
+        name_idx, addr_idx = headers.index(name_col), headers.index(addr_col)
 
         rows: List[Dict[str, str]] = []
         for row in reader:
-            name = (row.get(name_col) or "").strip()
-            addr = (row.get(addr_col) or "").strip()
+            name = row[name_idx].strip() if name_idx < len(row) else ""
+            addr = row[addr_idx].strip() if addr_idx < len(row) else ""
             if name or addr:
                 rows.append({"name": name, "address": addr})
     if not rows:
         raise RuntimeError("No usable rows found. Ensure CSV has 'name' and 'address' with data.")
+    return rows
+
+def gen_chunk(seed: Optional[int], n: int, rows: List[Dict[str, str]]) -> List[bytes]:
+    """Generate `n` independent samples as serialized JSONL lines (runs in a worker)."""
+    _rng.seed(seed)  # None -> OS entropy
 
-    out_lines: List[str] = []
+    # Draw row picks plus the inclusion and template rolls for every sample
+    # up-front instead of interleaving them with the per-sample string work
+    picks = _rng.choices(rows, k=n)
+    rolls = [(_rng.random(), _rng.random()) for _ in range(n)]
+    ids = uuid4_batch(n)
 
-    for _ in range(NUM_SAMPLES):
-        r = random.choice(rows)
+    lines: List[bytes] = []
+    for r, (roll, tmpl_roll), ex_id in zip(picks, rolls, ids):
         base_name = r["name"]
         base_addr = r["address"]
 
         # Decide inclusion
         include_name = True
         include_addr = True
-        roll = random.random()
         if roll < P_ONLY_NAME:
             include_addr = False
         elif roll < P_ONLY_NAME + P_ONLY_ADDR:
@@ -322,35 +378,31 @@ def main():
             base_addr, P_PARTIAL_ADDR, P_SPLIT_ADDR, kind="addr"
         ) if (include_addr and base_addr) else ""
 
-        # Build candidates; ensure at least something is produced
-        bag = build_variants(name_ins, addr_ins)
-        if not bag:
+        # Render the chosen template; ensure at least something is produced
+        text = render_variant(name_ins, addr_ins, tmpl_roll)
+        if not text:
             # if both empty after inclusion rules, fallback to a simple one
             if base_name:
                 name_ins = transform_entity_with_partials(base_name, P_PARTIAL_NAME, P_SPLIT_NAME, "name")
-                bag = build_variants(name_ins, "")
+                text = render_variant(name_ins, "", tmpl_roll)
             elif base_addr:
                 addr_ins = transform_entity_with_partials(base_addr, P_PARTIAL_ADDR, P_SPLIT_ADDR, "addr")
-                bag = build_variants("", addr_ins)
-
-        text = random.choice(bag)
+                text = render_variant("", addr_ins, tmpl_roll)
 
         # Build protected spans (all occurrences of entities in the clean text)
-        protected = []
-        protected += find_all_spans(text, name_ins)
-        protected += find_all_spans(text, addr_ins)
+        entity_spans = find_entity_spans(text, name_ins, addr_ins)
+        protected = [(s, e) for s, e, _ in entity_spans]
 
         # Apply one light fuzz outside protected spans (low probability)
         text, fuzz_info = apply_light_fuzz_outside_entities(text, protected, p=LIGHT_FUZZ_PROB)
         # (Optional) you can log fuzz_info if you want to audit where it happened
 
-        # Auto-annotate after fuzz, using the exact inserted strings
-        spans: List[Dict] = []
-        for s, e in find_all_spans(text, name_ins):
-            spans.append({"start": s, "end": e, "label": "NAME"})
-        for s, e in find_all_spans(text, addr_ins):
-            spans.append({"start": s, "end": e, "label": "ADDR"})
-
+        # Auto-annotate after fuzz, using the exact inserted strings. The fuzz
+        # swaps one char outside every occurrence, so the clean-text spans stay
+        # valid; only rescan when it fired (it may create a new occurrence).
+        if fuzz_info is not None:
+            entity_spans = find_entity_spans(text, name_ins, addr_ins)
+        spans: List[Dict] = [{"start": s, "end": e, "label": lab} for s, e, lab in entity_spans]
 
         # De-overlap just in case
         spans.sort(key=lambda x: (x["start"], x["end"]))
@@ -361,11 +413,40 @@ def main():
                 dedup.append(sp)
                 last_end = sp["end"]
 
-        ex = {"id": str(uuid.uuid4()), "text": text, "spans": dedup}
-        out_lines.append(json.dumps(ex, ensure_ascii=False))
+        ex = {"id": ex_id, "text": text, "spans": dedup}
+        lines.append(dumps_line(ex))
+    return lines
+
+def _gen_job(job) -> List[bytes]:
+    return gen_chunk(*job)
 
-    pathlib.Path(OUTPUT_FILE).write_text("\n".join(out_lines), encoding="utf-8")
-    print(f"Wrote {len(out_lines)} examples to {OUTPUT_FILE}")
+def main():
+    pathlib.Path(OUTPUT_FILE).parent.mkdir(parents=True, exist_ok=True)
+    rows = load_rows()
+
+    # Samples are independent, so split them into fixed-size chunks, each seeded
+    # with RANDOM_SEED + chunk index, and spread the chunks over worker processes.
+    # The output only depends on the seed and CHUNK_SIZE, not on the worker count.
+    # Platforms without "fork" (e.g. Windows) run in-process.
+    jobs = [
+        (None if RANDOM_SEED is None else RANDOM_SEED + i, min(CHUNK_SIZE, NUM_SAMPLES - start), rows)
+        for i, start in enumerate(range(0, NUM_SAMPLES, CHUNK_SIZE))
+    ]
+    nproc = NUM_WORKERS or os.cpu_count() or 1
+    if nproc > 1 and "fork" not in mp.get_all_start_methods():
+        nproc = 1
+    nproc = max(1, min(nproc, len(jobs)))
+
+    with open(OUTPUT_FILE, "wb", buffering=1 << 20) as out:
+        if nproc == 1:
+            for job in jobs:
+                out.writelines(gen_chunk(*job))
+        else:
+            with mp.get_context("fork").Pool(nproc) as pool:
+                for lines in pool.imap(_gen_job, jobs):  # in chunk order
+                    out.writelines(lines)
+
+    print(f"Wrote {NUM_SAMPLES} examples to {OUTPUT_FILE} using {nproc} process(es)")
 
 if __name__ == "__main__":
     main()
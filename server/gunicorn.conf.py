@@ -0,0 +1,23 @@
+"""
+Gunicorn settings for serving the detector (picked up automatically from server/):
+
+    cd server && gunicorn main:app
+
+preload_app imports main.py once in the master, so the tokenizer and the INT8
+session are built before forking and every worker shares those pages
+copy-on-write instead of loading its own copy. Scale by worker count, not threads.
+"""
+import multiprocessing
+import os
+
+# One ORT/OpenMP thread per worker. This also keeps the fork safe: with a single
+# intra-op thread the session owns no thread pool that the fork could orphan.
+# Must be set here, before preload imports main.py and creates the session.
+os.environ.setdefault("ORT_INTRA_OP_THREADS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = 60
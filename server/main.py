@@ -1,13 +1,24 @@
-from fastapi import FastAPI
-from pydantic import BaseModel, Field
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, Field, ValidationError, model_validator
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, List, Optional
+from fastapi.responses import ORJSONResponse
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
 from pathlib import Path
+import email.message
+import hashlib
 import json
+import logging
+import os
+import re
+import threading
 import numpy as np
 import onnxruntime as ort
 from transformers import AutoTokenizer
 
+log = logging.getLogger(__name__)
+
 BASE_DIR      = Path(__file__).resolve().parent
 TOKENIZER_DIR = BASE_DIR / "onnx_int8"
 ONNX_PATH     = TOKENIZER_DIR / "model.onnx"
@@ -30,126 +41,265 @@ elif isinstance(id2label, list):
 else:
     LABELS = ["O", "B-NAME", "I-NAME", "B-ADDR", "I-ADDR"]  # fallback
 
+# Label-id lookup tables, so decoding never parses label strings per token.
+# TYPES are the entity types in label order; "O" maps to the extra id len(TYPES).
+_label_type = [lab.split("-", 1)[1] if "-" in lab else lab for lab in LABELS]
+TYPES = list(dict.fromkeys(t for lab, t in zip(LABELS, _label_type) if lab != "O"))
+LABEL_TYPE_ID = np.array(
+    [len(TYPES) if lab == "O" else TYPES.index(t) for lab, t in zip(LABELS, _label_type)],
+    dtype=np.intp,
+)
+LABEL_IS_B = np.array([lab.startswith("B-") for lab in LABELS], dtype=bool)
+
 tok = AutoTokenizer.from_pretrained(str(TOKENIZER_DIR))
+NUM_SPECIAL = tok.num_special_tokens_to_add()  # [CLS] + [SEP] in every window
+MODEL_MAX_LEN = cfg.get("max_position_embeddings", 512)
+
+def cpu_int8_flags() -> Dict[str, bool]:
+    """Fast INT8 GEMM extensions advertised by the CPU (Linux /proc/cpuinfo; {} elsewhere)."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    flags = set(line.split(":", 1)[1].split())
+                    return {k: k in flags for k in ("avx512_vnni", "avx_vnni", "amx_int8")}
+    except OSError:
+        pass
+    return {}
+
+INT8_FLAGS = cpu_int8_flags()
+if INT8_FLAGS and not any(INT8_FLAGS.values()):
+    log.warning("CPU advertises no VNNI/AMX INT8 support; quantized MatMuls take the slow path")
+else:
+    log.info("CPU INT8 extensions: %s", INT8_FLAGS or "unknown")
 
 so = ort.SessionOptions()
-so.intra_op_num_threads = 1
+so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+# FastAPI's threadpool already runs requests concurrently, so default to one thread
+# per run; single-request deployments can opt into more (0 = one per physical core)
+so.intra_op_num_threads = int(os.environ.get("ORT_INTRA_OP_THREADS", "1"))
 so.inter_op_num_threads = 1
+so.enable_mem_pattern = True
+so.enable_cpu_mem_arena = True
+so.add_session_config_entry("session.qdqisint8allowed", "1")
 sess = ort.InferenceSession(str(ONNX_PATH), sess_options=so, providers=["CPUExecutionProvider"])
 ACTIVE_PROVIDER = sess.get_providers()[0]
+INPUT_NAMES = [i.name for i in sess.get_inputs()]  # e.g. input_ids, attention_mask
 
+# Every window runs at exactly its token count (no padding, no length buckets), which
+# needs a model exported with a dynamic sequence axis.
+if any(isinstance(i.shape[-1], int) for i in sess.get_inputs()):
+    raise RuntimeError(f"{ONNX_PATH} has a fixed sequence length; re-export with a dynamic seq axis")
 
-def np_softmax(x: np.ndarray, axis: int = -1) -> np.ndarray:
-    x = x - np.max(x, axis=axis, keepdims=True)
-    e = np.exp(x)
-    return e / np.sum(e, axis=axis, keepdims=True)
+# Windows scored per session run. The INT8 graph quantizes activations dynamically
+# with one scale per tensor, so rows batched together change each other's logits
+# (up to ~1.4 on this model); keep 1 so a window's spans never depend on its neighbours.
+WINDOW_BATCH = 1
 
-def decode_chunk(text: str, threshold: float, per_type: Dict[str, float], max_len: int):
-    enc = tok(
-        text,
+# Character window of the old char-space tiling; stride_chars is an overlap within it.
+LEGACY_CHUNK_CHARS = 2000
+
+# Text with no letters or digits (only whitespace and punctuation) has no NAME/ADDR
+# to find; it skips the tokenizer and model and returns no spans. Digits stay with
+# the model: unit and block numbers alone ("#12-34 560123") can be an ADDR.
+_TRIVIAL_RE = re.compile(r"^[\s\W_]*$")
+
+# Opt-in /detect result cache, per worker process: DETECT_CACHE_SIZE entries, 0 (the
+# default) disables it. Entries are keyed on a BLAKE2b digest of the text plus the
+# options and hold only offsets, labels and scores, so no request text is retained.
+# Texts longer than CACHE_MAX_CHARS are rarely repeated verbatim and are not cached.
+DETECT_CACHE_SIZE = int(os.environ.get("DETECT_CACHE_SIZE", "0"))
+CACHE_MAX_CHARS = 4096
+_detect_cache: "OrderedDict[Tuple, Tuple]" = OrderedDict()
+_detect_cache_lock = threading.Lock()  # sync routes run in FastAPI's threadpool
+
+
+def encode(texts, max_len: int, stride: Optional[int] = None):
+    """
+    Tokenize one text or a list of texts into numpy arrays padded to the longest row.
+    With `stride`, text longer than max_len overflows into extra rows that overlap by
+    `stride` tokens, all with offsets in the original text's coordinates.
+    """
+    return tok(
+        texts,
         return_offsets_mapping=True,
         return_tensors="np",
         truncation=True,
         max_length=max_len,
+        padding=True,
+        stride=stride or 0,
+        return_overflowing_tokens=stride is not None,
     )
-    inputs = {
-        "input_ids":      enc["input_ids"].astype(np.int64),
-        "attention_mask": enc["attention_mask"].astype(np.int64),
-    }
-    if "token_type_ids" in enc:
-        inputs["token_type_ids"] = enc["token_type_ids"].astype(np.int64)
-
-    outputs = sess.run(None, inputs)
-    logits = outputs[0]  # (1, seq, num_labels) or (seq, num_labels)
-    if logits.ndim == 3:
-        logits = logits[0]
-    probs  = np_softmax(logits, axis=-1)
-    ids    = probs.argmax(-1)
-    offs   = enc["offset_mapping"][0]
-
-    spans: List[Dict] = []
-    cur: Optional[Dict] = None
-
-    chosen = probs[np.arange(len(ids)), ids]
-
-    for i, (lab_id, p) in enumerate(zip(ids, chosen)):
-        s, e = map(int, offs[i])
-        if (s == 0 and e == 0) or e <= s:
-            continue
-
-        lab = LABELS[int(lab_id)]
-        if lab == "O":
-            if cur:
-                spans.append(cur)
-                cur = None
-            continue
-
-        typ = lab.split("-", 1)[1] if "-" in lab else lab
-        thr = per_type.get(typ, threshold)
-        if p < thr:
-            if cur:
-                spans.append(cur)
-                cur = None
-            continue
-
-        start_new = (cur is None) or (typ != cur["label"]) or lab.startswith("B-")
-        if start_new:
-            if cur:
-                spans.append(cur)
-            cur = {"start": s, "end": e, "label": typ, "score": float(p)}
-        else:
-            cur["end"] = max(cur["end"], e)
-            cur["score"] = max(cur["score"], float(p))
 
-    if cur:
-        spans.append(cur)
+def run_model(enc) -> np.ndarray:
+    """Run the session on a tokenized batch; returns (batch, seq, num_labels) logits."""
+    # Fast tokenizers already return contiguous int64, so this is a no-copy view in
+    # the common case (unlike .astype, which always copies); it only copies for
+    # other dtypes or sliced, non-contiguous batches.
+    inputs = {name: np.ascontiguousarray(enc[name], dtype=np.int64) for name in INPUT_NAMES}
 
-    for s in spans:
-        s["text"] = text[s["start"]:s["end"]]
-    return spans
+    logits = sess.run(None, inputs)[0]  # (batch, seq, num_labels) or (seq, num_labels)
+    if logits.ndim == 2:
+        logits = logits[None]
+    return logits
 
-def detect(text: str, threshold: float, per_label_threshold: Optional[Dict[str, float]],
-           max_len: int, stride_chars: int):
+# Spans are passed around as parallel arrays (starts, ends, type_ids, scores) and
+# only become dicts once, in spans_to_dicts, for the response.
+Spans = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+NO_SPANS: Spans = (np.empty(0, np.int32), np.empty(0, np.int32),
+                   np.empty(0, np.intp), np.empty(0, np.float32))
+
+def spans_to_dicts(text: str, spans: Spans) -> List[Dict]:
+    return [
+        {"start": a, "end": b, "label": TYPES[t], "score": sc, "text": text[a:b]}
+        for a, b, t, sc in zip(*(col.tolist() for col in spans))
+    ]
+
+def type_log_thresholds(threshold: float, per_type: Dict[str, float]) -> np.ndarray:
+    """log(threshold) indexed by type id, plus a +inf slot for "O"; built once per request."""
+    # A probability is never below 0, so flooring thresholds at 0 keeps every comparison
+    # the same while keeping log() defined. fmax also maps a NaN threshold (accepted
+    # from JSON) to 0: "p < nan" is False, so those tokens were always kept.
+    thr = np.fmax([per_type.get(t, threshold) for t in TYPES], 0.0)
+    with np.errstate(divide="ignore"):  # a 0.0 threshold becomes -inf
+        return np.log(np.append(thr, np.inf).astype(np.float32))
+
+def decode_logits(logits: np.ndarray, offs: np.ndarray, log_thr: np.ndarray) -> Spans:
+    """Turn one row of (seq, num_labels) logits and (seq, 2) int32 offsets into spans."""
+    # softmax is monotonic, so argmax the logits directly and only compute the
+    # chosen label's log-probability: max - logsumexp == -log(sum(exp(x - max))).
+    # Thresholds are compared in log space, and only each span's best score is
+    # exponentiated at the end. The logits row is scratch after argmax, so the
+    # shift and exp reuse its buffer when it is writeable.
+    ids  = logits.argmax(-1)
+    top  = logits[np.arange(len(ids)), ids]
+    x    = np.subtract(logits, top[:, None], out=logits if logits.flags.writeable else None)
+    logp = -np.log(np.exp(x, out=x).sum(-1))
+
+    # Vectorized span decoding. Tokens without a character extent (special tokens,
+    # padding) are dropped up-front; they never opened or closed a span anyway.
+    offs  = offs[:len(ids)]
+    valid = np.flatnonzero(offs[:, 1] > offs[:, 0])
+    if not len(valid):
+        return NO_SPANS
+    lab, lp = ids[valid], logp[valid]
+    s, e   = offs[valid, 0], offs[valid, 1]
+    typ    = LABEL_TYPE_ID[lab]
+
+    # A token is kept if it is not "O" (the O slot of the table is +inf) and clears
+    # its type's threshold. A kept token opens a new span unless it continues the
+    # previous token's kept span of the same type and is not a "B-" tag.
+    keep    = lp >= log_thr[typ]
+    cont    = np.zeros_like(keep)
+    cont[1:] = keep[:-1] & (typ[1:] == typ[:-1])
+    new     = keep & ~(cont & ~LABEL_IS_B[lab])
+
+    kept = np.flatnonzero(keep)
+    if not len(kept):
+        return NO_SPANS
+    heads = np.flatnonzero(new[kept])  # first kept token of each span, as positions in `kept`
+    return (
+        s[kept[heads]],
+        np.maximum.reduceat(e[kept], heads),
+        typ[kept[heads]],
+        np.exp(np.maximum.reduceat(lp[kept], heads)),
+    )
+
+def merge_spans(spans: Spans) -> Spans:
+    """Sort spans and merge same-type runs that touch or overlap (max end / max score)."""
+    starts, ends, types, scores = spans
+    if len(starts) < 2:
+        return spans
+    order = np.lexsort((ends, starts))  # stable, like sorting by (start, end)
+    starts, ends, types, scores = starts[order], ends[order], types[order], scores[order]
+
+    # A span joins the previous group when it has the same type and starts at or
+    # before the furthest end seen so far in the current same-type run. Offsetting
+    # each run by run_id * big makes one cumulative max restart at every run.
+    run_id = np.concatenate(([0], np.cumsum(types[1:] != types[:-1])))
+    big = int(ends.max()) + 1
+    reach = np.maximum.accumulate(run_id * big + ends) - run_id * big
+    new = np.ones(len(starts), dtype=bool)
+    new[1:] = (types[1:] != types[:-1]) | (starts[1:] > reach[:-1])
+
+    heads = np.flatnonzero(new)
+    return (
+        starts[heads],
+        np.maximum.reduceat(ends, heads),
+        types[heads],
+        np.maximum.reduceat(scores, heads),
+    )
+
+def detect_many(texts: List[str], threshold: float,
+                per_label_threshold: Optional[Dict[str, float]], max_len: int,
+                stride_chars: int, stride_tokens: Optional[int] = None) -> List[List[Dict]]:
+    results: List[List[Dict]] = [[] for _ in texts]
+    todo = [i for i, text in enumerate(texts) if not _TRIVIAL_RE.match(text)]
+    if not todo:
+        return results
     # defaults for your two classes; caller can override
     per_type = {"NAME": threshold, "ADDR": max(threshold, 0.70)}
     if per_label_threshold:
         per_type.update(per_label_threshold)
 
-    # Fast path: short input
-    if len(tok(text)["input_ids"]) <= max_len:
-        return decode_chunk(text, threshold, per_type, max_len)
-
-    # Long input: slide over chars, then merge overlapping spans
-    spans_all: List[Dict] = []
-    i = 0
-    CHUNK = 2000  # char window; tokenizer will clamp to max_len
-    n = len(text)
-    while i < n:
-        piece = text[i:i + CHUNK]
-        spans = decode_chunk(piece, threshold, per_type, max_len)
-        for s in spans:
-            s["start"] += i
-            s["end"]   += i
-            s["text"]   = text[s["start"]:s["end"]]
-        spans_all.extend(spans)
-        step = max(CHUNK - stride_chars, 1)
-        i += step
-
-
-    spans_all.sort(key=lambda x: (x["start"], x["end"]))
-    merged: List[Dict] = []
-    for s in spans_all:
-        if not merged:
-            merged.append(s)
-            continue
-        m = merged[-1]
-        if s["label"] == m["label"] and s["start"] <= m["end"]:
-            m["end"]  = max(m["end"], s["end"])
-            m["score"] = max(m["score"], s["score"])
-            m["text"]  = text[m["start"]:m["end"]]
+    # Tile in token space: one tokenizer pass over all texts yields every max_len
+    # window, each overlapping the previous one of the same text by stride_tokens,
+    # with offsets already in that text's coordinates. Short input is one window.
+    if stride_tokens is None:
+        # keep the legacy overlap ratio (stride_chars of a 2000-char window, ~25% by
+        # default) rather than ~4 chars per token, which overlapped windows by half
+        stride_tokens = max_len * stride_chars // LEGACY_CHUNK_CHARS
+    # the overlap must leave at least one new content token per window
+    stride = max(0, min(stride_tokens, max_len // 2, max_len - NUM_SPECIAL - 1))
+    enc = encode([texts[i] for i in todo], max_len, stride=stride)
+    log_thr = type_log_thresholds(threshold, per_type)
+    sample_of = enc["overflow_to_sample_mapping"].tolist()
+    # one int32 cast for every window's offsets; spans stay int32 until spans_to_dicts
+    offsets = enc["offset_mapping"].astype(np.int32)
+
+    windows: List[List[Spans]] = [[] for _ in todo]
+    for b in range(0, len(enc["input_ids"]), WINDOW_BATCH):
+        # Run at the real length, not padded to max_len or a pow2 bucket: padded
+        # positions cost FLOPs and also feed the dynamic quantization scales.
+        L = int(enc["attention_mask"][b:b + WINDOW_BATCH].sum(-1).max())
+        logits = run_model({k: enc[k][b:b + WINDOW_BATCH, :L] for k in INPUT_NAMES})
+        for row in range(len(logits)):
+            spans = decode_logits(logits[row], offsets[b + row], log_thr)
+            windows[sample_of[b + row]].append(spans)
+
+    for i, ws in zip(todo, windows):
+        if len(ws) == 1:
+            spans = ws[0]
         else:
-            merged.append(s)
-    return merged
+            spans = merge_spans(tuple(np.concatenate(col) for col in zip(*ws)))
+        results[i] = spans_to_dicts(texts[i], spans)
+    return results
+
+def detect(text: str, threshold: float, per_label_threshold: Optional[Dict[str, float]],
+           max_len: int, stride_chars: int, stride_tokens: Optional[int] = None):
+    if not DETECT_CACHE_SIZE or len(text) > CACHE_MAX_CHARS:
+        return detect_many([text], threshold, per_label_threshold, max_len,
+                           stride_chars, stride_tokens)[0]
+    # dicts aren't hashable: key the cache on the sorted per-label items instead
+    per_label_items = (tuple(sorted(per_label_threshold.items()))
+                       if per_label_threshold is not None else None)
+    digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    key = (digest, threshold, per_label_items, max_len, stride_chars, stride_tokens)
+    with _detect_cache_lock:
+        hit = _detect_cache.get(key)
+        if hit is not None:
+            _detect_cache.move_to_end(key)
+    if hit is not None:
+        return [{"start": a, "end": b, "label": lab, "score": sc, "text": text[a:b]}
+                for a, b, lab, sc in hit]
+
+    spans = detect_many([text], threshold, per_label_threshold, max_len,
+                        stride_chars, stride_tokens)[0]
+    with _detect_cache_lock:
+        _detect_cache[key] = tuple((s["start"], s["end"], s["label"], s["score"]) for s in spans)
+        if len(_detect_cache) > DETECT_CACHE_SIZE:
+            _detect_cache.popitem(last=False)
+    return spans
 
 app = FastAPI(title="PII NER (ONNX INT8, CPU)", version="1.0.0")
 app.add_middleware(
@@ -157,14 +307,81 @@ app.add_middleware(
     allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
 )
 
-class DetectReq(BaseModel):
-    text: str = Field(..., description="Raw text")
+class DetectOptions(BaseModel):
     threshold: float = Field(0.65, ge=0.0, le=0.99)
     per_label_threshold: Optional[Dict[str, float]] = Field(
         default=None, description='Per-type thresholds, e.g. {"NAME":0.65,"ADDR":0.70}'
     )
-    max_len: int = Field(256, description="Tokenizer max length (tokens)")
-    stride_chars: int = Field(512, description="Char overlap for long text chunking")
+    max_len: int = Field(256, ge=8, le=MODEL_MAX_LEN, description="Tokenizer max length (tokens)")
+    stride_chars: int = Field(512, description="Legacy window overlap in chars, of a 2000-char window")
+    stride_tokens: Optional[int] = Field(
+        default=None, description="Token overlap between long-text windows (default max_len * stride_chars // 2000)"
+    )
+
+class DetectReq(DetectOptions):
+    text: str = Field(..., description="Raw text; text without letters or digits returns no spans")
+
+# All windows of a batch are tokenized into one array, so bound what a single
+# request can ask for; larger jobs are split client-side.
+MAX_BATCH_TEXTS = 64
+MAX_BATCH_CHARS = 200_000
+
+class DetectBatchReq(DetectOptions):
+    texts: List[str] = Field(..., max_length=MAX_BATCH_TEXTS,
+                             description="Raw texts, each scored independently")
+
+    @model_validator(mode="after")
+    def _check_total_chars(self):
+        if sum(map(len, self.texts)) > MAX_BATCH_CHARS:
+            raise ValueError(f"texts exceed {MAX_BATCH_CHARS} characters in total")
+        return self
+
+def is_json_content_type(value: Optional[str]) -> bool:
+    """Whether FastAPI would parse a body with this Content-Type as JSON (none counts)."""
+    if not value:
+        return True
+    message = email.message.Message()
+    message["content-type"] = value
+    subtype = message.get_content_subtype()
+    return message.get_content_maintype() == "application" and (
+        subtype == "json" or subtype.endswith("+json"))
+
+def json_body(model):
+    """
+    Dependency that validates the raw request body as `model` in one pydantic-core pass
+    (model_validate_json) instead of json.loads into dicts followed by model validation.
+    Errors match FastAPI's own body handling: 422 for a non-JSON Content-Type, bad
+    JSON or invalid fields, 400 for a body that is not UTF-8.
+    """
+    async def parse(request: Request):
+        body = await request.body()
+        if not is_json_content_type(request.headers.get("content-type")):
+            raise RequestValidationError([{
+                "type": "model_attributes_type", "loc": ("body",), "input": None,
+                "msg": "Input should be a valid dictionary or object to extract fields from",
+            }])
+        try:
+            return model.model_validate_json(body)
+        except ValidationError as e:
+            errors = e.errors(include_url=False)
+            if any(err["type"] == "json_invalid" for err in errors):
+                try:
+                    body.decode("utf-8")
+                except UnicodeDecodeError:
+                    raise HTTPException(400, "There was an error parsing the body") from e
+            # json_invalid carries the raw body bytes as input, which can't be encoded
+            # into the response; FastAPI reports {} there too
+            raise RequestValidationError([
+                {**err, "loc": ("body", *err["loc"]),
+                 **({"input": {}} if err["type"] == "json_invalid" else {})}
+                for err in errors
+            ]) from e
+    return parse
+
+def json_body_docs(model) -> Dict:
+    """openapi_extra documenting a json_body request body."""
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": model.model_json_schema()}}}}
 
 class Span(BaseModel):
     start: int
@@ -178,11 +395,29 @@ class DetectResp(BaseModel):
     provider: str
     labels: List[str]
 
+class DetectBatchResp(BaseModel):
+    results: List[List[Span]]
+    provider: str
+    labels: List[str]
+
 @app.get("/health")
 def health():
     return {"ok": True, "provider": ACTIVE_PROVIDER, "labels": LABELS}
 
-@app.post("/detect", response_model=DetectResp)
-def detect_endpoint(req: DetectReq):
-    spans = detect(req.text, req.threshold, req.per_label_threshold, req.max_len, req.stride_chars)
-    return {"spans": spans, "provider": ACTIVE_PROVIDER, "labels": LABELS}
+# The span dicts are built by this module with exact types, so the hot endpoints
+# return ORJSONResponse directly: no response_model re-validation, no
+# jsonable_encoder walk, orjson serialization. The models stay for OpenAPI docs.
+# Request bodies go through json_body for the same reason.
+@app.post("/detect", response_class=ORJSONResponse, responses={200: {"model": DetectResp}},
+          openapi_extra=json_body_docs(DetectReq))
+def detect_endpoint(req: DetectReq = Depends(json_body(DetectReq))):
+    spans = detect(req.text, req.threshold, req.per_label_threshold, req.max_len,
+                   req.stride_chars, req.stride_tokens)
+    return ORJSONResponse({"spans": spans, "provider": ACTIVE_PROVIDER, "labels": LABELS})
+
+@app.post("/detect_batch", response_class=ORJSONResponse, responses={200: {"model": DetectBatchResp}},
+          openapi_extra=json_body_docs(DetectBatchReq))
+def detect_batch_endpoint(req: DetectBatchReq = Depends(json_body(DetectBatchReq))):
+    results = detect_many(req.texts, req.threshold, req.per_label_threshold, req.max_len,
+                          req.stride_chars, req.stride_tokens)
+    return ORJSONResponse({"results": results, "provider": ACTIVE_PROVIDER, "labels": LABELS})
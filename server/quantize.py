@@ -0,0 +1,53 @@
+"""Rebuild onnx_int8/model.onnx from an FP32 ONNX export, or check an existing one.
+
+    python -m server.quantize path/to/fp32/model.onnx [server/onnx_int8/model.onnx]
+    python -m server.quantize --check [server/onnx_int8/model.onnx]
+
+quantize_dynamic writes QOperator format (DynamicQuantizeLinear + MatMulInteger),
+which ORT runs on the VNNI/AMX MLAS kernels. Don't use quantize_static/QDQ for this
+model: on x64 CPU the QDQ DequantizeLinear -> MatMul path can be slower than FP32.
+"""
+import sys
+from pathlib import Path
+from typing import Dict
+
+import onnx
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+DEFAULT_DST = Path(__file__).resolve().parent / "onnx_int8" / "model.onnx"
+QUANT_OPS = ("MatMulInteger", "DynamicQuantizeLinear", "DequantizeLinear", "MatMul")
+
+def quantize(src, dst=DEFAULT_DST):
+    quantize_dynamic(
+        str(src), str(dst),
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        reduce_range=False,
+        extra_options={"EnableSubgraph": True, "MatMulConstBOnly": True},
+    )
+
+def graph_op_counts(path) -> Dict[str, int]:
+    """Op-type histogram of the ONNX graph."""
+    counts: Dict[str, int] = {}
+    for node in onnx.load(str(path), load_external_data=False).graph.node:
+        counts[node.op_type] = counts.get(node.op_type, 0) + 1
+    return counts
+
+def check(path=DEFAULT_DST) -> bool:
+    """Print the quantized op counts; False if the graph looks QDQ rather than QOperator."""
+    counts = graph_op_counts(path)
+    print(f"{path}: " + " ".join(f"{k}={counts.get(k, 0)}" for k in QUANT_OPS))
+    if counts.get("MatMulInteger", 0) < counts.get("DequantizeLinear", 0):
+        print("Model looks QDQ-quantized; rebuild it from the FP32 export with this script")
+        return False
+    return True
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--check"] and len(args) <= 2:
+        sys.exit(0 if check(*args[1:]) else 1)
+    if len(args) not in (1, 2):
+        sys.exit(__doc__)
+    quantize(*args)
+    print(f"Wrote {args[1] if len(args) == 2 else DEFAULT_DST}")
+    check(*args[1:])
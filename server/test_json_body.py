@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+
+from server.main import app
+
+client = TestClient(app)
+
+def post(body: bytes, content_type: str = "application/json"):
+    return client.post("/detect", content=body, headers={"content-type": content_type})
+
+def test_non_utf8_body_is_400():
+    for body in (b'\xff\xfe{"text": "x"}', b'{"text": "\xff John Tan"}'):
+        r = post(body)
+        assert r.status_code == 400
+        assert r.json() == {"detail": "There was an error parsing the body"}
+
+def test_malformed_json_is_422():
+    r = post(b'{"text": ')
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["type"] == "json_invalid"
+
+def test_non_json_content_type_is_422():
+    for content_type in ("text/plain", "application/x-www-form-urlencoded"):
+        r = post(b'{"text": "John Tan"}', content_type)
+        assert r.status_code == 422
+        assert r.json()["detail"][0]["loc"] == ["body"]
+
+def test_json_content_types_are_parsed():
+    for content_type in ("application/json", "application/json; charset=utf-8",
+                         "application/merge-patch+json"):
+        assert post(b'{"text": "John Tan"}', content_type).status_code == 200